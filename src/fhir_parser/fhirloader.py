@@ -1,8 +1,15 @@
 #!/usr/bin/env python
 from .logger import logger
+from concurrent.futures import ThreadPoolExecutor
+import copy
 from fhirspec import Configuration
 from fhirspec import download
+import os
 import pathlib
+import shutil
+import zipfile
+
+_ZIP_SUFFIX = ".zip"
 
 
 class FHIRLoader(object):
@@ -33,19 +40,17 @@ class FHIRLoader(object):
             assert not force_cache
 
         if self.cache.exists() and force_download:
-            import shutil
-
             shutil.rmtree(self.cache)
 
         if not self.cache.exists():
             self.cache.mkdir(parents=True)
 
-        # check all files and download if missing
+        # check all files and download if missing, listing the cache once
+        with os.scandir(self.cache) as entries:
+            cached = {entry.name for entry in entries}
         uses_cache = False
         for local, remote in self.__class__.needs.items():
-            path_ = self.cache / local
-
-            if not path_.exists():
+            if local not in cached:
                 if force_cache:
                     raise Exception("Resource missing from cache: {}".format(local))
                 logger.info("Downloading {}".format(remote))
@@ -53,7 +58,7 @@ class FHIRLoader(object):
                 filepath = self.download(remote)
                 filename = filepath.name
                 # unzip
-                if ".zip" == filename[-4:]:
+                if filename.endswith(_ZIP_SUFFIX):
                     logger.info("Extracting {}".format(filename))
                     target = self.cache
                     if expand_dir:
@@ -76,8 +81,6 @@ class FHIRLoader(object):
         :returns: The local file name in our cache directory the file was
             downloaded to
         """
-        import requests  # import here as we can bypass its use with a manual download
-
         url = self.base_url + "/" + filename
         print(url)
         return download(url, download_directory=self.cache)
@@ -88,52 +91,65 @@ class FHIRLoader(object):
         """
         assert filepath.exists() and filepath.is_file()
         print(f"expanding {filepath} to {target}")
-        # import here as we can bypass its use with a manual unzip
-        import zipfile
 
         # make sure the target directory exists
         target.mkdir(parents=True, exist_ok=True)
 
         with zipfile.ZipFile(filepath) as z:
-            # 1) filter out the “noise” entries
-            all_members = z.infolist()
+            # filter out the “noise” entries
             real_members = [
-                m for m in all_members
+                m for m in z.infolist()
                 if not m.filename.startswith('__MACOSX/')
             ]
 
-            # 2) find all top‐level names (the bit before the first '/')
-            roots = {
-                pathlib.Path(m.filename).parts[0]
-                for m in real_members
+            # the single root folder, if any, is the common prefix of all
+            # names up to its first '/'
+            prefix = os.path.commonprefix([
+                m.filename for m in real_members
                 if m.filename.strip()  # skip any zero‐length names
-            }
+            ])
+            root = prefix[:prefix.find('/') + 1]    # e.g. "myapp/", or ""
 
             # if exactly one root folder, strip it
-            if len(roots) == 1:
-                root = roots.pop().rstrip('/') + '/'    # e.g. "myapp/"
+            if root:
+                file_members = []
                 for m in real_members:
                     if not m.filename.startswith(root):
                         # skip anything not under that one folder
                         continue
 
                     # compute the path *inside* the archive, sans the root prefix
-                    inner_path = pathlib.Path(m.filename[len(root):])
-                    if not inner_path.parts:
+                    inner_path = m.filename[len(root):]
+                    if not inner_path.strip('/'):
                         # this was exactly the folder itself, no file to write
                         continue
 
                     outpath = target / inner_path
 
+                    # create directories up front so the workers never race on mkdir
                     if m.is_dir():
                         outpath.mkdir(parents=True, exist_ok=True)
                     else:
                         outpath.parent.mkdir(parents=True, exist_ok=True)
-                        with z.open(m) as src, open(outpath, 'wb') as dst:
-                            dst.write(src.read())
+                        # extract under the stripped name, `orig_filename` is
+                        # kept so the local header still matches
+                        member = copy.copy(m)
+                        member.filename = inner_path
+                        file_members.append(member)
+
+                def extract_chunk(chunk):
+                    # ZipFile is not thread-safe, every worker opens its own
+                    with zipfile.ZipFile(filepath) as zf:
+                        zf.extractall(target, members=chunk)
+
+                # zlib releases the GIL, so the members decompress in parallel
+                workers = os.cpu_count() or 1
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(
+                        extract_chunk,
+                        [file_members[i::workers] for i in range(workers)],
+                    ))
             else:
                 # more than one real root → just extract everything normally
                 # (still drop __MACOSX/)
-                members_to_extract = [m.filename for m in all_members
-                                    if not m.filename.startswith('__MACOSX/')]
-                z.extractall(target, members=members_to_extract)
+                z.extractall(target, members=real_members)
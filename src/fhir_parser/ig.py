@@ -1,66 +1,97 @@
-import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import os
 from pathlib import Path
-from queue import Queue
 import re
-from typing import Callable, Iterator, cast
+from typing import Callable, Iterator
 import fhirspec
 
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # orjson is optional, json.loads also accepts bytes
+    from json import loads as _json_loads
+
 LOGGER = logging.getLogger(__name__)
 
+# a single alternation matches iff any of the patterns would ("(?!)" never matches)
+_UNSUPPORTED_PROFILES = re.compile(
+    '|'.join(f'(?:{pattern})' for pattern in fhirspec.UNSUPPORTED_PROFILES) or '(?!)'
+)
+
 def fhir_package_files(package_path: Path) -> Iterator[Path]:
-    for file in (package_path / 'package').iterdir():
-        if file.is_file() and file.suffix == '.json':
-            yield file
+    # DirEntry.is_file uses the cached entry type, no stat per file
+    with os.scandir(package_path / 'package') as entries:
+        for entry in entries:
+            if entry.name.endswith('.json') and entry.is_file():
+                yield Path(entry.path)
+
+
+def _load_json(file: Path) -> tuple[Path, dict]:
+    with open(file, 'rb') as f:
+        return file, _json_loads(f.read())
 
 
 def _process_profile(spec: fhirspec.FHIRSpec, resource) -> fhirspec.FHIRStructureDefinition | None:
     profile: fhirspec.FHIRStructureDefinition = fhirspec.FHIRStructureDefinition(spec, resource)
-    for pattern in fhirspec.UNSUPPORTED_PROFILES:
-        assert isinstance(profile.url, str)
-        if re.search(pattern, profile.url) is not None:
-            LOGGER.info(f'Skipping "{resource["url"]}"')
-            return
-    if not profile or not profile.name:
+    url = profile.url
+    name = profile.name
+    if _UNSUPPORTED_PROFILES.search(url) is not None:
+        LOGGER.info(f'Skipping "{resource["url"]}"')
+        return
+    if not name:
         raise Exception(f"No name for profile {profile}")
     if spec.found_profile(profile):
         profile.process_profile()
-        profile.targetname = f"{profile.name}{profile.targetname}"
-        print(f'Profile {profile.name} -> target: {profile.targetname}')
+        targetname = f"{name}{profile.targetname}"
+        profile.targetname = targetname
+        print(f'Profile {name} -> target: {targetname}')
         return profile
 
 def add_igs_to_spec(spec: fhirspec.FHIRSpec, ig_files: Iterator[Path]):
     profiles = []
-    resource_queue = Queue()
-    for file in ig_files:
-        with open(file, encoding='utf-8') as f:
-            parsed = json.load(f)
+    resource_queue: deque[dict] = deque()
+    # reading and decoding is I/O bound, the files are independent
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        for file, parsed in executor.map(_load_json, list(ig_files)):
             if "resourceType" not in parsed:
                 LOGGER.warning(f'Expecting "resourceType" to be present, but is not in {file}')
                 continue
-            resource_queue.put(parsed)
-    while not resource_queue.empty():
-        parsed = resource_queue.get()
-        resourceType = parsed['resourceType']
-        if resourceType == "Bundle":
-            if "entry" in parsed:
-                for e in parsed['entry']:
-                    resource_queue.put(e['resource'])
-        elif resourceType == "StructureDefinition":
-            profiles.append(parsed)
-        elif resourceType == "ValueSet":
-            assert "url" in parsed
-            spec.valuesets[parsed["url"]] = fhirspec.FHIRValueSet(spec, parsed)
-        elif resourceType == "CodeSystem":
-            assert "url" in parsed
-            if "content" in parsed and "concept" in parsed:
-                spec.codesystems[parsed["url"]] = fhirspec.FHIRCodeSystem(spec, parsed)
-            else:
-                LOGGER.warning(f"CodeSystem with no concepts: {parsed['url']}")
+            resource_queue.append(parsed)
+
+    def _bundle(parsed: dict):
+        # take the entries out so the bundle and its wrappers can be freed
+        # as soon as the resources are queued
+        resource_queue.extend(e['resource'] for e in parsed.pop('entry', ()))
+
+    def _structure_definition(parsed: dict):
+        profiles.append(parsed)
+
+    def _value_set(parsed: dict):
+        assert "url" in parsed
+        spec.valuesets[parsed["url"]] = fhirspec.FHIRValueSet(spec, parsed)
+
+    def _code_system(parsed: dict):
+        assert "url" in parsed
+        if "content" in parsed and "concept" in parsed:
+            spec.codesystems[parsed["url"]] = fhirspec.FHIRCodeSystem(spec, parsed)
         else:
-            LOGGER.warning(
-                    f'Unknown resourceType {resourceType}'
-                )
+            LOGGER.warning(f"CodeSystem with no concepts: {parsed['url']}")
+
+    def _unknown(parsed: dict):
+        LOGGER.warning(
+                f'Unknown resourceType {parsed["resourceType"]}'
+            )
+
+    handlers: dict[str, Callable[[dict], None]] = {
+        "Bundle": _bundle,
+        "StructureDefinition": _structure_definition,
+        "ValueSet": _value_set,
+        "CodeSystem": _code_system,
+    }
+    while resource_queue:
+        parsed = resource_queue.popleft()
+        handlers.get(parsed['resourceType'], _unknown)(parsed)
 
     LOGGER.info(
             f"Found {len(spec.valuesets)} ValueSets and "
@@ -68,7 +99,13 @@ def add_igs_to_spec(spec: fhirspec.FHIRSpec, ig_files: Iterator[Path]):
         )
 
 
-    for prof in cast(Iterator[fhirspec.FHIRStructureDefinition],filter(lambda x: x is not None, map(lambda resource: _process_profile(spec, resource), profiles))):
+    # profiles are processed one after the other: found_profile/process_profile
+    # register into the spec and the shared FHIRClass registry, so they can be
+    # neither moved to other processes nor run concurrently
+    for resource in profiles:
+        prof = _process_profile(spec, resource)
+        if prof is None:
+            continue
         prof.finalize()
         if len(prof.elements_sequences) == 0:
             for item in prof.structure.snapshot[1:]: